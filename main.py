@@ -12,12 +12,25 @@ import urllib.request
 import json
 import webbrowser
 import gettext
-from queue import Queue
+import codecs
+import io
+import atexit
+import shutil
+import shlex
+import time
+import locale
+from collections import OrderedDict, deque
 from tkinter import filedialog, messagebox
 
 import customtkinter as ctk
 from plyer import notification
 
+try:                                # optional, faster JSON parsing
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # ─────────────────────────────  i18n (stub)  ────────────────────────────────
 _ = gettext.gettext  # later you can load .mo files
 
@@ -54,36 +67,108 @@ yt_dlp_exe     = os.path.join(cfg_dir,  "yt-dlp.exe")
 log_file       = os.path.join(cfg_dir,  "activity.log")
 prefs_file     = os.path.join(cfg_dir,  "prefs.json")
 plugins_folder = os.path.join(cfg_dir,  "plugins")
+_DEFAULT_FOLDER = os.getcwd()       # fallback "Save To", resolved once
 
 os.makedirs(cfg_dir,        exist_ok=True)
 os.makedirs(plugins_folder, exist_ok=True)
 
-try:
-    with open(prefs_file, "r", encoding="utf-8") as f:
-        prefs: dict = json.load(f)
-except Exception:
-    prefs = {}
+_prefs_cache: dict | None = None
+
+
+def get_prefs() -> dict:
+    """Load prefs.json on first use; parse the raw bytes directly."""
+    global _prefs_cache
+    if _prefs_cache is None:
+        try:
+            with open(prefs_file, "rb") as f:
+                _prefs_cache = _json_loads(f.read())
+        except Exception:
+            _prefs_cache = {}
+    return _prefs_cache
+
+
+def save_prefs() -> None:
+    tmp = prefs_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(get_prefs(), f, indent=2)
+    os.replace(tmp, prefs_file)
+
+# one shared append handle for every worker thread instead of reopening
+log_fh   = open(log_file, "ab", buffering=1 << 15)
+log_lock = threading.Lock()
+atexit.register(log_fh.close)     # close() flushes whatever is buffered
 
 # ────────────────────────  globals  ─────────────────────────────────────────
 current_process: subprocess.Popen | None = None
-q: Queue = Queue()
-pump_id: str | None = None
-clipboard_last: str = ""
+q: deque[str] = deque(maxlen=8192)  # drops oldest output if the UI lags
+pump_pending: bool = False          # a drain is already scheduled
+pump_lock = threading.Lock()
+scroll_pending: bool = False        # autoscroll already queued for this frame
+last_trim: float = 0.0              # monotonic time of the last scrollback trim
+MAX_LOG_LINES = 5000                # scrollback kept in the log tab
+clipboard_hash: int = 0
+filename_cache: OrderedDict[tuple[str, str], str] = OrderedDict()  # LRU
+filename_lock = threading.Lock()
+FILENAME_CACHE_SIZE = 256
+notify_q: deque[tuple[str, str]] = deque()
+notify_wake = threading.Event()
+# plain-Python mirrors of the option vars, kept current by trace callbacks
+_audio: bool    = False
+_quality: str   = "Best"
+_sub_lang: str  = ""
+_sponsor: bool  = False
 
 # ────────────────────────  helpers  ─────────────────────────────────────────
-def get_expected_filename(url: str, folder: str) -> str | None:
-    """Ask yt-dlp what filename it would use (without downloading)."""
+def _probe_filenames(urls: list[str], folder: str) -> dict[str, str]:
+    """Run one yt-dlp process for *urls*; map each URL to its filename.
+
+    URLs that failed or expanded into several entries are left out.
+    """
     try:
         out = subprocess.run(
-            [yt_dlp_exe, "--no-print-traffic", "--print", "filename", url],
+            [yt_dlp_exe, "--no-print-traffic", "--ignore-errors",
+             "--print", "%(original_url)s\t%(filename)s", *urls],
             stdout=subprocess.PIPE,
             stderr=subprocess.DEVNULL,
-            check=True,
             text=True
         )
-        return os.path.join(folder, out.stdout.strip())
     except Exception:
-        return None
+        return {}
+    names: dict[str, str | None] = {}
+    for line in out.stdout.splitlines():
+        url, sep, name = line.partition("\t")
+        if not sep:
+            continue
+        # a playlist prints several lines for one URL – no single answer
+        names[url] = None if url in names else os.path.join(folder, name.strip())
+    return {u: n for u, n in names.items() if n and u in urls}
+
+
+def get_expected_filenames(urls: list[str], folder: str) -> list[str | None]:
+    """Ask yt-dlp what filenames it would use, in a single process.
+
+    Only successful probes are cached, so a failed one is retried next time.
+    """
+    with filename_lock:
+        missing = [u for u in urls if (u, folder) not in filename_cache]
+    found = _probe_filenames(missing, folder) if missing else {}
+    with filename_lock:
+        for url, name in found.items():
+            filename_cache[(url, folder)] = name
+        result = []
+        for url in urls:
+            key = (url, folder)
+            if key in filename_cache:
+                filename_cache.move_to_end(key)
+            result.append(filename_cache.get(key))
+        while len(filename_cache) > FILENAME_CACHE_SIZE:
+            filename_cache.popitem(last=False)
+    return result
+
+
+def get_expected_filename(url: str, folder: str) -> str | None:
+    """Ask yt-dlp what filename it would use (without downloading)."""
+    return get_expected_filenames([url], folder)[0]
 
 
 def ask_overwrite(path: str) -> bool:
@@ -93,76 +178,258 @@ def ask_overwrite(path: str) -> bool:
         parent=app
     )
 
+
+def _mirror(var, name: str) -> None:
+    """Copy *var* into global *name* now and on every write."""
+    globals()[name] = var.get()
+    var.trace_add("write", lambda *_a: globals().__setitem__(name, var.get()))
+
 # ────────────────────  worker & queue pump  ─────────────────────────────────
-def _run_yt_dlp(args: list[str], post_hook: str | None = None) -> None:
+def emit(text: str) -> None:
+    """Queue output for the log box and wake the UI only if no drain is pending."""
+    global pump_pending
+    q.append(text)  # deque append/popleft are atomic – no lock needed
+    with pump_lock:
+        if pump_pending:
+            return
+        pump_pending = True
+    app.after(0, pump_queue)  # after() is safe from worker threads
+
+
+def _run_yt_dlp(args: list[str], batch: list[str],
+                post_hook: list[str] | str | None = None,
+                hook_shell: bool = False) -> None:
+    """Run yt-dlp once for all *batch* URLs, fed via --batch-file -."""
     global current_process
+    # yt-dlp's stdin/stdout use the locale codec, same as text=True would
+    encoding = locale.getpreferredencoding(False)
     try:
-        with open(log_file, "a", encoding="utf-8") as lg:
-            current_process = subprocess.Popen(
-                args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-            )
-            for line in current_process.stdout:  # type: ignore
-                q.put(line)
-                lg.write(line)
-            current_process.wait()
+        current_process = subprocess.Popen(
+            [args[0], "--batch-file", "-", *args[1:]],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            stdin=subprocess.PIPE, bufsize=1 << 16
+        )
+        # yt-dlp reads the whole batch file before it starts, so close stdin
+        stdin = current_process.stdin
+        stdin.write(("\n".join(batch) + "\n").encode(encoding, "replace"))  # type: ignore
+        stdin.close()  # type: ignore
+        # incremental so characters split across chunks survive; the newline
+        # wrapper translates \r / \r\n like text mode, even across chunks
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(encoding)("replace"), translate=True)
+        stdout = current_process.stdout
+        while chunk := stdout.read1(1 << 16):  # type: ignore
+            with log_lock:  # raw bytes, no re-encode; buffered until exit
+                log_fh.write(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                emit(text)
+        text = decoder.decode(b"", final=True)
+        if text:
+            emit(text)
+        current_process.wait()
     except Exception as e:
-        q.put(f"[ERROR] {e}\n")
+        emit(f"[ERROR] {e}\n")
     finally:
         current_process = None
+        with log_lock:
+            log_fh.flush()
         if post_hook:
             try:
-                subprocess.Popen(post_hook, shell=True)
+                subprocess.Popen(post_hook, shell=hook_shell)
+            except Exception as e:
+                emit(f"[ERROR] post hook: {e}\n")
+        # desktop notification – handed off so the worker can exit at once;
+        # kept short because Windows balloon tips cap the text at 256 chars
+        if len(batch) == 1:
+            message = batch[0][:200]
+        else:
+            message = _("{0} downloads finished").format(len(batch))
+        notify_q.append((_("Download Complete"), message))
+        notify_wake.set()
+
+
+def _notifier() -> None:
+    """Single consumer for desktop notifications (DBus / toast calls can block)."""
+    while True:
+        notify_wake.wait()
+        notify_wake.clear()
+        while notify_q:
+            title, message = notify_q.popleft()
+            try:
+                notification.notify(title=title, message=message)
             except Exception:
                 pass
-        # desktop notification
-        try:
-            notification.notify(
-                title=_("Download Complete"),
-                message=args[1] if len(args) > 1 else _("Finished")
-            )
-        except Exception:
-            pass
 
 
-def threaded_yt_dlp(args: list[str], post_hook: str | None = None) -> None:
-    threading.Thread(target=_run_yt_dlp, args=(args, post_hook),
+threading.Thread(target=_notifier, daemon=True).start()
+
+
+def threaded_yt_dlp(args: list[str], batch: list[str],
+                    post_hook: str | None = None) -> None:
+    # Windows takes the command line as-is; POSIX needs an argv list
+    hook: list[str] | str | None = post_hook
+    hook_shell = False
+    if post_hook and os.name != "nt":
+        try:
+            hook = shlex.split(post_hook)
+        except ValueError:  # unbalanced quotes etc. – let the shell have it
+            hook_shell = True
+    threading.Thread(target=_run_yt_dlp, args=(args, batch, hook, hook_shell),
                      daemon=True).start()
 
 
 def pump_queue() -> None:
-    while not q.empty():
-        line = q.get()
+    global pump_pending, scroll_pending, last_trim
+    with pump_lock:
+        pump_pending = False  # clear first so lines queued mid-drain reschedule us
+    lines: list[str] = []
+    while q:
+        lines.append(q.popleft())
+    if lines:  # one insert per drain instead of per line
         output_box.configure(state="normal")
-        output_box.insert("end", line)
-        output_box.see("end")
+        output_box.insert("end", "".join(lines))
+        now = time.monotonic()
+        if now - last_trim >= 1.0:  # cap scrollback; check at most once a second
+            last_trim = now
+            n = int(output_box.index("end-1c").split(".")[0])
+            if n > MAX_LOG_LINES:
+                output_box.delete("1.0", f"{n - MAX_LOG_LINES + 1}.0")
         output_box.configure(state="disabled")
-    global pump_id
-    pump_id = app.after(100, pump_queue)
+        if not scroll_pending:  # scroll at most once per ~60 Hz frame
+            scroll_pending = True
+            app.after(16, _scroll_to_end)
+
+
+def _scroll_to_end() -> None:
+    global scroll_pending
+    scroll_pending = False
+    output_box.see("end")
 
 # ───────────────────────  clipboard watcher  ────────────────────────────────
-def poll_clipboard() -> None:
-    global clipboard_last
+_HTTP = ("http://", "https://")
+
+
+def _on_clipboard_change() -> None:
+    global clipboard_hash
     try:
         clip = app.clipboard_get()
-        if clip.startswith("http") and clip != clipboard_last:
+        clip_hash = hash(clip)
+        if clip_hash != clipboard_hash and clip.startswith(_HTTP):
             url_text.delete("1.0", "end")
             url_text.insert("end", clip)
-            clipboard_last = clip
+            clipboard_hash = clip_hash
     except Exception:
         pass
+
+
+def poll_clipboard() -> None:
+    """Fallback for platforms without clipboard change notifications."""
+    _on_clipboard_change()
     app.after(2000, poll_clipboard)
 
+
+def _listen_clipboard_win32() -> None:
+    """Wait for WM_CLIPBOARDUPDATE on a hidden message-only window."""
+    import ctypes
+    from ctypes import wintypes
+
+    WM_CLIPBOARDUPDATE = 0x031D
+    HWND_MESSAGE       = -3
+
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    user32.CreateWindowExW.restype  = wintypes.HWND
+    user32.CreateWindowExW.argtypes = [
+        wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+        wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID,
+    ]
+    user32.AddClipboardFormatListener.argtypes = [wintypes.HWND]
+    user32.GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND,
+                                   wintypes.UINT, wintypes.UINT]
+
+    try:
+        # the predefined STATIC class needs no window procedure of our own
+        hwnd = user32.CreateWindowExW(0, "STATIC", None, 0, 0, 0, 0, 0,
+                                      HWND_MESSAGE, None, None, None)
+        if not hwnd or not user32.AddClipboardFormatListener(hwnd):
+            raise ctypes.WinError(ctypes.get_last_error())
+    except Exception:
+        app.after(0, poll_clipboard)
+        return
+
+    msg = wintypes.MSG()
+    while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+        if msg.message == WM_CLIPBOARDUPDATE:
+            app.after(0, _on_clipboard_change)
+
+
+def watch_clipboard() -> None:
+    if sys.platform.startswith("win"):
+        _on_clipboard_change()  # the listener only reports later changes
+        threading.Thread(target=_listen_clipboard_win32, daemon=True).start()
+    else:
+        poll_clipboard()
+
 # ─────────────────  ensure yt-dlp.exe is present  ───────────────────────────
+YT_DLP_URL = "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe"
+
+
+update_lock = threading.Lock()  # one download at a time into the .tmp file
+
+
+def download_yt_dlp() -> bool:
+    """Fetch yt-dlp.exe unless a HEAD request shows ours is current.
+
+    Returns True if a new binary was installed.
+    """
+    with update_lock:
+        prefs = get_prefs()
+        head = urllib.request.Request(YT_DLP_URL, method="HEAD")
+        try:
+            with urllib.request.urlopen(head, timeout=30) as resp:
+                tag = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        except OSError:  # HEAD refused (405/403) or flaky – just download
+            tag = None
+        if tag and tag == prefs.get("yt_dlp_etag") and os.path.exists(yt_dlp_exe):
+            return False
+
+        tmp = yt_dlp_exe + ".tmp"
+        try:
+            with urllib.request.urlopen(YT_DLP_URL, timeout=30) as resp, \
+                    open(tmp, "wb") as f:
+                shutil.copyfileobj(resp, f, 1 << 20)
+                tag = (resp.headers.get("ETag")
+                       or resp.headers.get("Last-Modified") or tag)
+            os.replace(tmp, yt_dlp_exe)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        prefs["yt_dlp_etag"] = tag
+        save_prefs()
+        return True
+
+
 def ensure_yt_dlp() -> None:
+    """Runs on a worker thread; only the error dialog touches Tk."""
     if os.path.exists(yt_dlp_exe):
         return
     try:
-        urllib.request.urlretrieve(
-            "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp.exe",
-            yt_dlp_exe
-        )
+        download_yt_dlp()
     except Exception as e:
-        messagebox.showerror(_("Download Failed"), str(e), parent=app)
+        app.after(0, lambda err=str(e): messagebox.showerror(
+            _("Download Failed"), err, parent=app))
+
+
+def update_yt_dlp() -> None:
+    try:
+        if download_yt_dlp():
+            emit(_("yt-dlp updated.") + "\n")
+        else:
+            emit(_("yt-dlp is already up to date.") + "\n")
+    except Exception as e:
+        emit(f"[ERROR] {e}\n")
 
 # ─────────────────  GUI auto-update stub  ───────────────────────────────────
 def check_app_update() -> None:
@@ -177,54 +444,66 @@ def pick_folder() -> None:
         folder_entry.insert(0, path)
 
 
-def start_download() -> None:
-    urls   = url_text.get("1.0", "end").strip().splitlines()
-    folder = folder_entry.get().strip() or os.getcwd()
-
-    for url in urls:
-        if not url:
-            continue
-
-        expected = get_expected_filename(url, folder)
+def _start_jobs(jobs: list[tuple[str, str | None]], args: list[str]) -> None:
+    """Main thread: confirm overwrites one at a time, then launch one batch."""
+    batch: list[str] = []
+    for url, expected in jobs:
         if expected and os.path.exists(expected):
             if not ask_overwrite(expected):
-                q.put(f"Skipped {url}\n")
+                emit(f"Skipped {url}\n")
                 continue
+        batch.append(url)
+    if batch:
+        threaded_yt_dlp(args, batch)
+
+
+def _probe_jobs(urls: list[str], folder: str, args: list[str]) -> None:
+    """Background thread: probe all filenames at once, then hop back to Tk."""
+    expected = get_expected_filenames(urls, folder)
+    app.after(0, _start_jobs, list(zip(urls, expected)), args)
 
-        args = [yt_dlp_exe, url, "-P", folder]
 
-        # audio vs video
-        if audio_var.get():
-            args += ["-x", "--audio-format", "mp3"]
+def start_download() -> None:
+    urls   = url_text.get("1.0", "end").strip().splitlines()
+    # strip like yt-dlp does, so results match %(original_url)s; drop dupes
+    urls   = list(dict.fromkeys(u.strip() for u in urls if u.strip()))
+    folder = folder_entry.get().strip() or _DEFAULT_FOLDER
+
+    # options are identical for every URL – read the widgets once
+    base_opts: list[str] = []
+
+    # audio vs video
+    if _audio:
+        base_opts += ["-x", "--audio-format", "mp3"]
+    else:
+        if _quality != "Best":
+            res = _quality.rstrip("p")
+            base_opts += ["-f", f"bestvideo[height<={res}]+bestaudio/best"]
         else:
-            qstr = quality_var.get()
-            if qstr != "Best":
-                res = qstr.rstrip("p")
-                args += ["-f", f"bestvideo[height<={res}]+bestaudio/best"]
-            else:
-                args += ["-f", "bv*+ba/best"]
-
-        # subs & sponsorblock
-        sub_lang = subs_var.get()
-        if sub_lang:
-            args += ["--write-subs", f"--sub-lang={sub_lang}"]
-        if sponsor_var.get():
-            args += ["--sponsorblock-remove", "all"]
-
-        # rate limit & proxy
-        rate = rate_entry.get().strip()
-        proxy = proxy_entry.get().strip()
-        if rate:
-            args += ["--limit-rate", rate]
-        if proxy:
-            args += ["--proxy", proxy]
-
-        # rename template
-        tpl = rename_entry.get().strip()
-        if tpl:
-            args += ["-o", tpl]
-
-        threaded_yt_dlp(args)
+            base_opts += ["-f", "bv*+ba/best"]
+
+    # subs & sponsorblock
+    if _sub_lang:
+        base_opts += ["--write-subs", f"--sub-lang={_sub_lang}"]
+    if _sponsor:
+        base_opts += ["--sponsorblock-remove", "all"]
+
+    # rate limit & proxy
+    rate = rate_entry.get().strip()
+    proxy = proxy_entry.get().strip()
+    if rate:
+        base_opts += ["--limit-rate", rate]
+    if proxy:
+        base_opts += ["--proxy", proxy]
+
+    # rename template
+    tpl = rename_entry.get().strip()
+    if tpl:
+        base_opts += ["-o", tpl]
+
+    args = [yt_dlp_exe, "-P", folder, *base_opts]
+    threading.Thread(target=_probe_jobs, args=(urls, folder, args),
+                     daemon=True).start()
 
 # ───────────────────────  UI construction  ─────────────────────────────────
 tabs = ctk.CTkTabview(app, width=800, height=640)
@@ -303,7 +582,7 @@ rename_entry.grid(row=3, column=0, columnspan=2,
 
 preset_var = ctk.StringVar(value="Default")
 preset_menu = ctk.CTkOptionMenu(settings,
-                                values=list(prefs.get("presets", {}).keys())
+                                values=list(get_prefs().get("presets", {}).keys())
                                 or ["Default"],
                                 variable=preset_var)
 preset_menu.grid(row=3, column=2, sticky="ew")
@@ -311,6 +590,12 @@ preset_menu.grid(row=3, column=2, sticky="ew")
 save_preset_btn = ctk.CTkButton(settings, text=_("Save Preset"), width=100)
 save_preset_btn.grid(row=3, column=3, padx=10, sticky="ew")
 
+# mirror option vars so start_download needs no Tcl round-trips
+_mirror(audio_var,   "_audio")
+_mirror(quality_var, "_quality")
+_mirror(subs_var,    "_sub_lang")
+_mirror(sponsor_var, "_sponsor")
+
 # action buttons -------------------------------------------------------------
 action_frame = ctk.CTkFrame(dl_tab, fg_color="transparent")
 action_frame.pack(pady=10)
@@ -320,7 +605,8 @@ download_btn = ctk.CTkButton(action_frame, text=_("Download"), width=120,
 download_btn.grid(row=0, column=0, padx=10)
 
 update_btn = ctk.CTkButton(action_frame, text=_("Update yt-dlp"), width=120,
-                           command=lambda: threaded_yt_dlp([yt_dlp_exe, "-U"]))
+                           command=lambda: threading.Thread(
+                               target=update_yt_dlp, daemon=True).start())
 update_btn.grid(row=0, column=1, padx=10)
 
 open_folder_btn = ctk.CTkButton(action_frame, text=_("Open Folder"), width=120,
@@ -341,9 +627,9 @@ ctk.CTkButton(log_frame, text=_("Open Log"),
     .pack(pady=(0, 10))
 
 # ───────────────────────  run  ──────────────────────────────────────────────
-app.after(100, pump_queue)
-app.after(2000, poll_clipboard)
-app.after_idle(ensure_yt_dlp)
+app.after_idle(watch_clipboard)
+app.after_idle(lambda: threading.Thread(target=ensure_yt_dlp,
+                                        daemon=True).start())
 app.after_idle(check_app_update)
 
 print(">>> Entering mainloop()")